@@ -1,8 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
+import traceback
 import sys
 import os
+from collections import deque
+from queue import Queue
 
 # Assuming DriveManager is in gdrive_manager.py in the same directory
 try:
@@ -11,23 +14,53 @@ except ImportError:
     print("Error: Could not import DriveManager. Make sure 'gdrive_manager.py' is in the same folder.")
     sys.exit(1)
 
+# How often (in ms) the main thread drains queued console output into the widget
+OUTPUT_DRAIN_MS = 50
+# Status bar updates arriving within this window (in ms) are merged into one redraw
+STATUS_COALESCE_MS = 16
+# Oldest console lines are discarded beyond this count to keep the Text widget fast
+MAX_OUTPUT_LINES = 5000
+
+def _tk_safe(text):
+    """Replaces characters Tk can't display (e.g. lone surrogates) so an insert can't fail."""
+    try:
+        text.encode("utf-8")
+        return text
+    except UnicodeEncodeError:
+        return text.encode("utf-8", "replace").decode("utf-8")
+
 # --- 1. Custom Console Redirection Class ---
 # This class redirects all print() statements to the GUI's text widget.
 class TextRedirector(object):
-    """A helper class to redirect standard output (sys.stdout) to a Tkinter Text widget."""
-    def __init__(self, widget, tag="stdout"):
-        self.widget = widget
+    """
+    A helper class to redirect standard output (sys.stdout) to a Tkinter Text widget.
+    Writes are buffered until a newline and then queued as whole lines (deque.append
+    is atomic, so any thread may print); the GUI thread drains the queue into the
+    widget in batches.
+    """
+    def __init__(self, queue, tag="stdout"):
+        self.queue = queue
         self.tag = tag
+        self._buf = []
+        self._lock = threading.Lock()
 
     def write(self, str):
-        self.widget.configure(state="normal")
-        self.widget.insert(tk.END, str, (self.tag,))
-        self.widget.see(tk.END) # Auto-scroll to the bottom
-        self.widget.configure(state="disabled")
+        with self._lock:
+            if "\n" not in str:
+                self._buf.append(str)
+                return
+            # Queue everything up to the last newline; keep the partial line buffered
+            head, _, tail = str.rpartition("\n")
+            self._buf.append(head + "\n")
+            self.queue.append(("".join(self._buf), self.tag))
+            self._buf = [tail] if tail else []
 
     def flush(self):
-        # Tkinter Text widgets often require a flush to update immediately
-        pass
+        # Queue any partial line; GDriveApp._drain_output moves it into the widget
+        with self._lock:
+            if self._buf:
+                self.queue.append(("".join(self._buf), self.tag))
+                self._buf = []
 
 # --- 2. Main GUI Application Class ---
 class GDriveApp:
@@ -47,15 +80,31 @@ class GDriveApp:
         self.upload_path_var = tk.StringVar(value="Select a file to upload...")
         self.delete_id_var = tk.StringVar(value="")
         self.status_var = tk.StringVar(value="Initializing...")
+        
+        # Latest requested (status text, cursor) and whether a redraw is already scheduled
+        self._pending_status = ("", None)
+        self._status_scheduled = False
+        self._status_lock = threading.Lock()
+        
+        # Treeview item ID of a folder -> child nodes not yet inserted into the file tree
+        self.unexpanded_folders = {}
 
         self._create_widgets()
         
-        # Start the Drive Manager initialization in a separate thread
+        # A single background worker runs Drive operations one at a time, in click order
+        self.tasks = Queue()
+        worker = threading.Thread(target=self._worker_loop)
+        worker.daemon = True # Allows the thread to exit with the main program
+        worker.start()
+        
+        # Start the Drive Manager initialization on the worker thread
         self._run_in_thread(self._initialize_manager)
         
         # Redirect print statements to the output area
-        sys.stdout = TextRedirector(self.output_text, "stdout")
-        sys.stderr = TextRedirector(self.output_text, "stderr")
+        self.output_queue = deque()
+        self.redirectors = (TextRedirector(self.output_queue, "stdout"), TextRedirector(self.output_queue, "stderr"))
+        sys.stdout, sys.stderr = self.redirectors
+        self.master.after(OUTPUT_DRAIN_MS, self._drain_output)
 
     def _create_widgets(self):
         """Builds all the main GUI components."""
@@ -81,12 +130,12 @@ class GDriveApp:
         # 2. Upload File Controls
         ttk.Entry(control_frame, textvariable=self.upload_path_var, state='readonly').grid(row=1, column=0, padx=5, pady=5, sticky="ew")
         ttk.Button(control_frame, text="Select File...", command=self.select_upload_file).grid(row=1, column=1, padx=5, pady=5, sticky="w")
-        ttk.Button(control_frame, text="2. Upload File", command=lambda: self._run_in_thread(self.upload_file)).grid(row=1, column=2, padx=5, pady=5, sticky="ew")
+        ttk.Button(control_frame, text="2. Upload File", command=lambda: self._run_in_thread(self.upload_file, self.upload_path_var.get())).grid(row=1, column=2, padx=5, pady=5, sticky="ew")
         
         # 3. Delete File Controls
         ttk.Label(control_frame, text="File ID to Delete:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
         ttk.Entry(control_frame, textvariable=self.delete_id_var).grid(row=2, column=1, padx=5, pady=5, sticky="ew")
-        ttk.Button(control_frame, text="3. Delete File", command=lambda: self._run_in_thread(self.delete_file)).grid(row=2, column=2, padx=5, pady=5, sticky="ew")
+        ttk.Button(control_frame, text="3. Delete File", command=lambda: self._run_in_thread(self.delete_file, self.delete_id_var.get())).grid(row=2, column=2, padx=5, pady=5, sticky="ew")
         
         # 4. Sorting Demo Button
         ttk.Button(control_frame, text="4. Run Sorting Demo", command=lambda: self._run_in_thread(self.sort_demo)).grid(row=3, column=0, padx=5, pady=5, sticky="ew")
@@ -98,69 +147,210 @@ class GDriveApp:
         # FIX: Changed 'master.quit' to 'self.master.quit' to reference the instance variable
         ttk.Button(control_frame, text="6. Exit", command=self.master.quit, style="Danger.TButton").grid(row=3, column=2, padx=5, pady=5, sticky="ew")
         
-        # --- Output Area ---
-        output_frame = ttk.LabelFrame(self.master, text="Console Output", padding="5")
-        output_frame.grid(row=2, column=0, columnspan=2, padx=10, pady=10, sticky="nsew")
+        # --- Output Area (tabs: file tree and console) ---
+        self.output_tabs = ttk.Notebook(self.master)
+        self.output_tabs.grid(row=2, column=0, columnspan=2, padx=10, pady=10, sticky="nsew")
+        
+        # File tree: folders are filled in lazily when first expanded
+        tree_frame = ttk.Frame(self.output_tabs, padding="5")
+        tree_frame.grid_rowconfigure(0, weight=1)
+        tree_frame.grid_columnconfigure(0, weight=1)
+        
+        self.file_tree = ttk.Treeview(tree_frame, columns=("id",))
+        self.file_tree.heading("#0", text="Name")
+        self.file_tree.heading("id", text="ID")
+        self.file_tree.column("#0", width=450)
+        self.file_tree.column("id", width=300)
+        self.file_tree.grid(row=0, column=0, sticky="nsew")
+        self.file_tree.bind("<<TreeviewOpen>>", self._on_tree_open)
+        
+        tree_scrollbar = ttk.Scrollbar(tree_frame, command=self.file_tree.yview)
+        tree_scrollbar.grid(row=0, column=1, sticky='ns')
+        self.file_tree['yscrollcommand'] = tree_scrollbar.set
+        
+        # Console: all print() output ends up here
+        output_frame = ttk.Frame(self.output_tabs, padding="5")
         output_frame.grid_rowconfigure(0, weight=1)
         output_frame.grid_columnconfigure(0, weight=1)
         
-        self.output_text = tk.Text(output_frame, height=15, state="disabled", wrap="word", font=('Consolas', 10))
+        # No wrapping: tree output is tabular, and Tk re-computes line wrapping on
+        # every insert. Undo is kept off so bulk inserts don't grow an undo stack.
+        self.output_text = tk.Text(output_frame, height=15, state="disabled", wrap="none", undo=False, font=('Consolas', 10))
         self.output_text.grid(row=0, column=0, sticky="nsew")
         
-        # Scrollbar for output area
+        # Scrollbars for output area
         scrollbar = ttk.Scrollbar(output_frame, command=self.output_text.yview)
         scrollbar.grid(row=0, column=1, sticky='ns')
         self.output_text['yscrollcommand'] = scrollbar.set
         
+        x_scrollbar = ttk.Scrollbar(output_frame, orient="horizontal", command=self.output_text.xview)
+        x_scrollbar.grid(row=1, column=0, sticky='ew')
+        self.output_text['xscrollcommand'] = x_scrollbar.set
+        
+        self.output_tabs.add(output_frame, text="Console Output")
+        self.output_tabs.add(tree_frame, text="File Tree")
+        
         # Custom style for the exit button
         style = ttk.Style()
         style.configure("Danger.TButton", foreground="white", background="red", font=('Arial', 10, 'bold'))
 
+    def _drain_output(self):
+        """Periodically flushes queued console output into the text widget."""
+        # Partial lines (e.g. print(..., end="")) should not wait for a newline forever
+        for redirector in self.redirectors:
+            redirector.flush()
+        self._flush_output()
+        self.master.after(OUTPUT_DRAIN_MS, self._drain_output)
+
+    def _flush_output(self):
+        """Moves all queued console output into the text widget with a single insert."""
+        queue = self.output_queue
+        if queue:
+            # Pop everything that is pending and merge consecutive chunks with the same tag
+            # so the whole batch becomes one insert(text, tags, text, tags, ...) call.
+            args = []
+            chunks, tag = [], None
+            while queue:
+                text, chunk_tag = queue.popleft()
+                if chunk_tag != tag and chunks:
+                    args += [_tk_safe("".join(chunks)), (tag,)]
+                    chunks = []
+                chunks.append(text)
+                tag = chunk_tag
+            args += [_tk_safe("".join(chunks)), (tag,)]
+
+            # Toggle the widget state once per batch, not once per write
+            self.output_text.configure(state="normal")
+            self.output_text.insert(tk.END, *args)
+            lines = int(self.output_text.index("end-1c").split(".")[0])
+            if lines > MAX_OUTPUT_LINES:
+                self.output_text.delete("1.0", f"{lines - MAX_OUTPUT_LINES + 1}.0")
+            self.output_text.see(tk.END) # Auto-scroll to the bottom
+            self.output_text.configure(state="disabled")
+
+    def _show_tree(self, roots):
+        """Replaces the file tree contents with the given top-level nodes."""
+        self.file_tree.delete(*self.file_tree.get_children())
+        self.unexpanded_folders.clear()
+        self._insert_tree_nodes("", roots)
+        # With nothing to show, stay on the console where the error/empty message was printed
+        self.output_tabs.select(1 if roots else 0)
+
+    def _insert_tree_nodes(self, parent_iid, nodes):
+        """Inserts one level of nodes; sub-items are only added once their folder is opened."""
+        for node in nodes:
+            icon = "📂" if node['is_folder'] else "📄"
+            # Let Treeview generate the item ID: a Drive ID can appear twice if the
+            # listing changed while paging, and duplicate iids make insert() fail
+            iid = self.file_tree.insert(parent_iid, tk.END, text=f"{icon} {node['name']}", values=(node['id'],), open=False)
+            if node['children']:
+                # Placeholder row so the folder gets an expand arrow
+                self.file_tree.insert(iid, tk.END, text="Loading...")
+                self.unexpanded_folders[iid] = node['children']
+
+    def _on_tree_open(self, event):
+        """Fills in a folder's sub-items the first time it is expanded."""
+        iid = self.file_tree.focus()
+        children = self.unexpanded_folders.pop(iid, None)
+        if children is not None:
+            self.file_tree.delete(*self.file_tree.get_children(iid))
+            self._insert_tree_nodes(iid, children)
+
     # --- 3. Threading Helper ---
     def _run_in_thread(self, func, *args):
-        """Starts a given function in a new thread to keep the GUI responsive."""
-        thread = threading.Thread(target=func, args=args)
-        thread.daemon = True # Allows the thread to exit with the main program
-        thread.start()
+        """Queues a given function for the worker thread to keep the GUI responsive."""
+        self.tasks.put((func, args))
+
+    def _worker_loop(self):
+        """Runs queued tasks forever; a failing task must not take the worker down."""
+        while True:
+            func, args = self.tasks.get()
+            try:
+                func(*args)
+            except Exception:
+                traceback.print_exc()
+                # The task never reached its own "Ready." update; don't leave the UI looking busy
+                self._set_status("Ready.", cursor="")
+
+    def _ui(self, func, *args, **kwargs):
+        """Schedules a widget update on the GUI thread; Tk must not be touched from worker threads."""
+        self.master.after_idle(lambda: func(*args, **kwargs))
+
+    def _set_status(self, text, cursor=None):
+        """
+        Requests a status bar update (and optionally a new cursor). Updates arriving
+        within STATUS_COALESCE_MS of each other are merged so only the latest is drawn.
+        """
+        with self._status_lock:
+            if cursor is None:
+                cursor = self._pending_status[1] # Keep a cursor change that is still pending
+            self._pending_status = (text, cursor)
+            if self._status_scheduled:
+                return
+            self._status_scheduled = True
+        self.master.after(STATUS_COALESCE_MS, self._apply_status)
+
+    def _apply_status(self):
+        """Draws the latest requested status (GUI thread only)."""
+        with self._status_lock:
+            text, cursor = self._pending_status
+            self._pending_status = ("", None)
+            self._status_scheduled = False
+        self.status_var.set(text)
+        if cursor is not None:
+            self.master.config(cursor=cursor)
+
+    def _ui_result(self, func, *args):
+        """
+        Runs func on the GUI thread (e.g. a yes/no dialog) and waits for its return value.
+        If func raises, the exception is re-raised here on the calling worker thread.
+        """
+        result = Queue(maxsize=1)
+
+        def call():
+            # Always put something on the queue, or the worker would wait forever
+            try:
+                result.put((True, func(*args)))
+            except Exception as e:
+                result.put((False, e))
+
+        self.master.after_idle(call)
+        ok, value = result.get()
+        if not ok:
+            raise value
+        return value
 
     # --- 4. DriveManager Wrappers (Run in Thread) ---
     def _initialize_manager(self):
         """Initializes the DriveManager and updates status."""
-        self.status_var.set("Connecting to Google Drive API...")
-        self.master.config(cursor="wait")
+        self._set_status("Connecting to Google Drive API...", cursor="wait")
         
         # Initialize the manager (this handles auth)
         manager = DriveManager()
         
         if manager.service:
             self.drive_manager = manager
-            self.status_var.set(f"Connected: {manager.user_info}")
-            messagebox.showinfo("Success", f"Successfully connected to Drive as: {manager.user_info}")
+            self._set_status(f"Connected: {manager.user_info}", cursor="")
+            self._ui(messagebox.showinfo, "Success", f"Successfully connected to Drive as: {manager.user_info}")
         else:
-            self.status_var.set("Authentication Failed. Check credentials.json.")
-            messagebox.showerror("Error", "Authentication failed. See console output for details.")
-            
-        self.master.config(cursor="") # Reset cursor
+            self._set_status("Authentication Failed. Check credentials.json.", cursor="")
+            self._ui(messagebox.showerror, "Error", "Authentication failed. See console output for details.")
 
     def list_files(self):
-        """Calls list_files on the manager and prints output via redirection."""
+        """Fetches the file tree on the worker thread and shows it in the File Tree tab."""
         if not self.drive_manager: 
-            messagebox.showwarning("Warning", "Manager not initialized.")
+            self._ui(messagebox.showwarning, "Warning", "Manager not initialized.")
             return
 
-        self.status_var.set("Fetching files...")
-        self.master.config(cursor="wait")
-        
-        # Clear previous output
-        self.output_text.configure(state="normal")
-        self.output_text.delete(1.0, tk.END)
-        self.output_text.configure(state="disabled")
+        self._set_status("Fetching files...", cursor="wait")
 
-        # The manager's list_files uses print(), which is redirected.
-        self.drive_manager.list_files()
+        # The manager's progress messages use print(), which is redirected.
+        roots = self.drive_manager.fetch_tree(
+            progress=lambda count: self._set_status(f"Fetching files... ({count} so far)"))
+        # Always refresh, so a failed or empty listing doesn't leave a stale tree on screen
+        self._ui(self._show_tree, roots)
         
-        self.status_var.set("Ready.")
-        self.master.config(cursor="")
+        self._set_status("Ready.", cursor="")
 
     def select_upload_file(self):
         """Opens a file dialog to select the file path."""
@@ -171,66 +361,59 @@ class GDriveApp:
         if filepath:
             self.upload_path_var.set(filepath)
 
-    def upload_file(self):
-        """Uploads the selected file."""
+    def upload_file(self, filepath):
+        """Uploads the selected file (path read on the GUI thread by the button command)."""
         if not self.drive_manager: 
-            messagebox.showwarning("Warning", "Manager not initialized.")
+            self._ui(messagebox.showwarning, "Warning", "Manager not initialized.")
             return
-            
-        filepath = self.upload_path_var.get()
+
         if not os.path.exists(filepath):
-            messagebox.showerror("Error", "File path invalid or file not found.")
+            self._ui(messagebox.showerror, "Error", "File path invalid or file not found.")
             return
 
-        self.status_var.set(f"Uploading {os.path.basename(filepath)}...")
-        self.master.config(cursor="wait")
+        self._set_status(f"Uploading {os.path.basename(filepath)}...", cursor="wait")
         
         self.drive_manager.upload_file(filepath)
         
-        self.status_var.set("Ready.")
-        self.master.config(cursor="")
+        self._set_status("Ready.", cursor="")
 
-    def delete_file(self):
-        """Deletes the file by ID."""
+    def delete_file(self, file_id):
+        """Deletes the file by ID (read on the GUI thread by the button command)."""
         if not self.drive_manager: 
-            messagebox.showwarning("Warning", "Manager not initialized.")
+            self._ui(messagebox.showwarning, "Warning", "Manager not initialized.")
             return
             
-        file_id = self.delete_id_var.get().strip()
+        file_id = file_id.strip()
         if not file_id:
-            messagebox.showerror("Error", "Please enter a valid File ID.")
+            self._ui(messagebox.showerror, "Error", "Please enter a valid File ID.")
             return
             
-        if not messagebox.askyesno("Confirm Deletion", f"Are you sure you want to delete file ID: {file_id}?"):
+        if not self._ui_result(messagebox.askyesno, "Confirm Deletion", f"Are you sure you want to delete file ID: {file_id}?"):
             return
 
-        self.status_var.set(f"Deleting file {file_id}...")
-        self.master.config(cursor="wait")
+        self._set_status(f"Deleting file {file_id}...", cursor="wait")
         
         self.drive_manager.delete_file(file_id)
         
-        self.status_var.set("Ready.")
-        self.master.config(cursor="")
-        self.delete_id_var.set("") # Clear input field
+        self._set_status("Ready.", cursor="")
+        self._ui(self.delete_id_var.set, "") # Clear input field
 
     def sort_demo(self):
         """Runs the sorting demo."""
         if not self.drive_manager: 
-            messagebox.showwarning("Warning", "Manager not initialized.")
+            self._ui(messagebox.showwarning, "Warning", "Manager not initialized.")
             return
             
-        self.status_var.set("Running sorting demo...")
-        self.master.config(cursor="wait")
+        self._set_status("Running sorting demo...", cursor="wait")
         
         self.drive_manager.sort_demo()
         
-        self.status_var.set("Ready.")
-        self.master.config(cursor="")
+        self._set_status("Ready.", cursor="")
 
     def check_user(self):
         """Checks and displays the logged-in user info."""
         if not self.drive_manager: 
-            self.status_var.set("Manager not initialized. Try reconnecting.")
+            self._set_status("Manager not initialized. Try reconnecting.")
             return
             
         # The display_user_info method uses print(), which is redirected.
@@ -1,7 +1,9 @@
 import os
 import io
+import mimetypes
 import time
 import sys
+from operator import itemgetter
 from googleapiclient.discovery import build
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
@@ -20,6 +22,14 @@ from googleapiclient.http import MediaFileUpload
 SCOPES = ['https://www.googleapis.com/auth/drive']
 TARGET_FOLDER_NAME = "CLI_Sorted_Archive"
 DRIVE_ROOT_ID = 'root'
+# Fetched mimeTypes are interned against this constant (see _iter_pages)
+FOLDER_MIME = sys.intern('application/vnd.google-apps.folder')
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024 # Resumable uploads send (and retry) the file in 8 MB chunks
+UPLOAD_NUM_RETRIES = 5 # Retries per failed chunk (with exponential backoff) before giving up
+
+# Precomputed pieces of each tree line: indentation per depth, and "Icon Type" by is_folder
+TREE_INDENTS = ["  | " * level for level in range(64)]
+TREE_PREFIXES = {True: f"📂 {'[Folder]':<8} ", False: f"📄 {'[File]':<8} "}
 
 class DriveManager:
     """Manages all Google Drive API interactions."""
@@ -27,6 +37,7 @@ class DriveManager:
     def __init__(self):
         self.service = self._authenticate_and_get_service()
         self.user_info = None
+        self._folder_ids = {} # Cache of folder name -> ID resolved by find_or_create_folder
         if self.service:
             self.user_info = self._get_user_info()
 
@@ -59,7 +70,9 @@ class DriveManager:
                 token.write(creds.to_json())
 
         try:
-            service = build('drive', 'v3', credentials=creds)
+            # Use the discovery document bundled with googleapiclient instead of
+            # downloading it on every launch
+            service = build('drive', 'v3', credentials=creds, static_discovery=True)
             return service
         except Exception as e:
             print(f"Error building Drive service: {e}")
@@ -78,95 +91,167 @@ class DriveManager:
             print(f"Error fetching user info: {e}")
             return "Unknown User"
 
+    def display_user_info(self):
+        """Prints the logged-in user's email (cached at startup, no API call)."""
+        if self.service and self.user_info:
+            print(f"\n✅ Logged in as: {self.user_info}")
+        else:
+            print("\n❌ Not logged in or authentication failed.")
+
     # --- Hierarchical Listing Functions ---
 
-    def _fetch_all_files(self):
-        """Fetches a large subset of files to build the tree structure."""
+    def _iter_pages(self, order_by=None):
+        """
+        Yields the Drive's files one result page (list) at a time, following nextPageToken.
+        Each page depends on the previous page's token, so requests are issued
+        sequentially; callers that stop iterating early skip the remaining pages.
+        order_by is passed to the API as orderBy; leave it unset when the caller
+        sorts client-side, since a server-side sort is then wasted work.
+        """
+        params = {'orderBy': order_by} if order_by else {}
+        page_token = None
+        while True:
+            results = self.service.files().list(
+                pageSize=1000,
+                pageToken=page_token,
+                fields="nextPageToken, files(id, name, mimeType, parents)",
+                **params).execute()
+            files = results.get('files', [])
+            for file in files:
+                file['mimeType'] = sys.intern(file['mimeType'])
+            yield files
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+    def _iter_files(self, order_by=None):
+        """Yields every file in the Drive, fetching further pages only as needed."""
+        for page in self._iter_pages(order_by):
+            yield from page
+
+    def _fetch_all_files(self, progress=None):
+        """
+        Fetches all files (across every result page) to build the tree structure.
+        If given, progress(count) is called after each page with the number of files so far.
+        """
         if not self.service: return []
         
-        # Max pageSize is 1000. For simplicity, we grab the first page.
-        print("\n--- Fetching file list (up to 1000 items) ---")
+        print("\n--- Fetching file list ---")
         try:
-            results = self.service.files().list(
-                pageSize=1000,
-                # Order folders first, then files by name
-                orderBy="folder,name", 
-                fields="nextPageToken, files(id, name, mimeType, parents)").execute()
-            return results.get('files', [])
+            files = []
+            for page in self._iter_pages():
+                files.extend(page)
+                if progress:
+                    progress(len(files))
+            return files
         except Exception as e:
             print(f"Error fetching files: {e}")
             return []
 
     def _build_tree(self, files):
-        """Organizes a flat list of files into a hierarchical tree structure."""
-        file_map = {file['id']: file for file in files}
-        tree = {} # Dictionary to hold top-level files/folders
-
+        """
+        Organizes a flat list of files into a hierarchical tree structure.
+        This is done in two phases to avoid KeyErrors due to file order.
+        """
+        file_map = {}
+        tree = {}
+
+        # Phase 1: Index files and enrich them with 'is_folder' and 'children'
         for file in files:
             file['children'] = []
-            file['is_folder'] = file['mimeType'] == 'application/vnd.google-apps.folder'
-            
-            parents = file.get('parents', [])
-            
-            # If the file is not attached to a parent that we also fetched, 
-            # or if its parent is the Drive root, treat it as a top-level item.
-            is_attached = False
-            for parent_id in parents:
-                # Attach to the first parent folder found in the map
-                if parent_id in file_map and file_map[parent_id]['is_folder']:
-                    file_map[parent_id]['children'].append(file)
-                    is_attached = True
-                    break 
-
-            # If not attached to a fetched folder, add it to the top-level tree view
-            if not is_attached:
+            file['is_folder'] = file['mimeType'] == FOLDER_MIME
+            # Folders first, then by name; precomputed so sorts can use itemgetter
+            file['_sort_key'] = (0 if file['is_folder'] else 1, file['name'])
+            file_map[file['id']] = file
+
+        # Phase 2: Link children to their parents. Drive items have a single
+        # parent, so only the first entry of 'parents' is considered.
+        get = file_map.get
+        for file in files:
+            parents = file.get('parents')
+            parent = get(parents[0]) if parents else None
+
+            if parent is not None and parent['is_folder']:
+                parent['children'].append(file)
+            else:
+                # If not attached to a fetched folder, add it to the top-level tree view
                 tree[file['id']] = file
-                
+
+        # Sort every folder's children once: folders first, then by name
+        for file in files:
+            if file['children']:
+                file['children'].sort(key=itemgetter('_sort_key'))
+
         return tree
 
-    def _print_tree(self, node, level=0):
-        """Recursively prints the file/folder tree with indentation and details."""
-        indent = "  | " * level
-        
-        # Determine the icon and format the display string
-        icon = "📂" if node.get('is_folder') else "📄"
-        type_str = "[Folder]" if node.get('is_folder') else "[File]"
-        
-        # Print the current node: Indent | Icon Type Name (ID)
-        print(f"{indent}{icon} {type_str:<8} {node['name'][:40]:<40} (ID: {node['id']})")
-        
-        # Recursively print children, if any
-        if node.get('is_folder') and node.get('children'):
-            # Sort children to keep folders together and then by name
-            sorted_children = sorted(node['children'], key=lambda x: (not x['is_folder'], x['name']))
-            for child in sorted_children:
-                self._print_tree(child, level + 1)
-                
-    def list_files(self):
-        """Public method to display files in a tree structure."""
-        files = self._fetch_all_files()
+    def _format_tree(self, node, level, out):
+        """Appends the formatted lines of a file/folder subtree to the 'out' list."""
+        # Walk the subtree with an explicit stack instead of recursion
+        stack = [(node, level)]
+        while stack:
+            node, level = stack.pop()
+            indent = TREE_INDENTS[level] if level < len(TREE_INDENTS) else "  | " * level
+            is_folder = bool(node.get('is_folder'))
+
+            # Format the current node: Indent | Icon Type Name (ID)
+            out.append(f"{indent}{TREE_PREFIXES[is_folder]}{node['name'][:40]:<40} (ID: {node['id']})")
+
+            if is_folder and node.get('children'):
+                # Children are already sorted by _build_tree; push in reverse
+                # so the first child is popped (and listed) first
+                for child in reversed(node['children']):
+                    stack.append((child, level + 1))
+
+    def fetch_tree(self, progress=None):
+        """
+        Fetches all files and returns the sorted top-level nodes of the tree.
+        Each folder node carries its (sorted) sub-items in 'children'.
+        progress is passed on to _fetch_all_files.
+        """
+        files = self._fetch_all_files(progress)
         if not files:
             print("No files found or error during fetch.")
-            return
+            return []
 
         print("\n--- Building and Displaying File Tree ---")
         tree_roots = self._build_tree(files)
 
-        # Print all nodes treated as roots
         # Sort roots: folders first, then files, then by name
-        sorted_roots = sorted(tree_roots.values(), key=lambda x: (not x['is_folder'], x['name']))
+        sorted_roots = sorted(tree_roots.values(), key=itemgetter('_sort_key'))
         
         if not sorted_roots:
             print("No top-level files or folders found.")
-            return
+        return sorted_roots
+
+    def format_tree(self):
+        """
+        Fetches all files and returns the whole tree as a single string,
+        or None if there is nothing to display.
+        """
+        sorted_roots = self.fetch_tree()
+        if not sorted_roots:
+            return None
 
+        out = []
         for file in sorted_roots:
-            self._print_tree(file)
+            self._format_tree(file, 0, out)
+        return "\n".join(out) + "\n"
+
+    def list_files(self):
+        """Public method to display files in a tree structure."""
+        # Write the whole tree out in one go
+        tree_text = self.format_tree()
+        if tree_text:
+            sys.stdout.write(tree_text)
 
     # --- Utility Functions (Updated to use internal fetch) ---
 
-    def upload_file(self, local_filepath, mime_type='application/octet-stream'):
-        """Uploads a local file to the root of the user's Drive."""
+    def upload_file(self, local_filepath, mime_type=None):
+        """
+        Uploads a local file to the root of the user's Drive as a resumable upload.
+        The MIME type is guessed from the file name unless given explicitly.
+        """
         if not self.service: return
 
         if not os.path.exists(local_filepath):
@@ -174,15 +259,26 @@ class DriveManager:
             print("Please create the file or use 'example_file.txt' for testing.")
             return
 
+        if not mime_type:
+            mime_type, _ = mimetypes.guess_type(local_filepath)
+            mime_type = mime_type or 'application/octet-stream'
+
         file_metadata = {'name': os.path.basename(local_filepath)}
-        media = MediaFileUpload(local_filepath, mimetype=mime_type)
+        media = MediaFileUpload(local_filepath, mimetype=mime_type, resumable=True, chunksize=UPLOAD_CHUNK_SIZE)
 
         try:
             print(f"📤 Uploading '{os.path.basename(local_filepath)}'...")
-            uploaded_file = self.service.files().create(
+            request = self.service.files().create(
                 body=file_metadata,
                 media_body=media,
-                fields='id, name').execute()
+                fields='id, name')
+
+            # Send the file chunk by chunk, reporting progress along the way
+            uploaded_file = None
+            while uploaded_file is None:
+                status, uploaded_file = request.next_chunk(num_retries=UPLOAD_NUM_RETRIES)
+                if status:
+                    print(f"   ...{int(status.progress() * 100)}% uploaded")
             print(f"✅ Successfully uploaded! Name: {uploaded_file['name']} | ID: {uploaded_file['id']}")
         except Exception as e:
             print(f"❌ Error during upload: {e}")
@@ -199,42 +295,57 @@ class DriveManager:
             print(f"❌ Error during deletion: {e}")
     
     def find_or_create_folder(self, folder_name):
-        """Searches for a folder by name and creates it if not found."""
+        """
+        Searches for a folder by name in the Drive root and creates it if not found.
+        The resolved ID is cached, so repeated calls don't hit the API again.
+        """
         if not self.service: return None
-        q = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and 'root' in parents and trashed=false"
-        results = self.service.files().list(q=q, fields="files(id)").execute()
+        if folder_name in self._folder_ids:
+            return self._folder_ids[folder_name]
+
+        # Escape backslashes and quotes so the name can't break out of the query string
+        safe_name = folder_name.replace("\\", "\\\\").replace("'", "\\'")
+        q = f"name='{safe_name}' and mimeType='{FOLDER_MIME}' and '{DRIVE_ROOT_ID}' in parents and trashed=false"
+        results = self.service.files().list(q=q, pageSize=1, fields="files(id)").execute()
         folders = results.get('files', [])
         
         if folders:
-            return folders[0]['id']
+            folder_id = folders[0]['id']
         else:
             file_metadata = {
                 'name': folder_name,
-                'mimeType': 'application/vnd.google-apps.folder'
+                'mimeType': FOLDER_MIME,
+                'parents': [DRIVE_ROOT_ID]
             }
             folder = self.service.files().create(body=file_metadata, fields='id').execute()
-            return folder.get('id')
+            folder_id = folder.get('id')
+
+        self._folder_ids[folder_name] = folder_id
+        return folder_id
 
     def sort_demo(self):
         """Demonstrates the core sorting logic (moving a file to a designated folder)."""
         if not self.service: return
 
         print("\n--- Initiating Sorting Demo ---")
-        # 1. Get files to find a candidate using the new fetch function
-        all_files = self._fetch_all_files()
-        
+        # 1. Scan files for a candidate; only the pages up to the first match are fetched
         file_to_move = None
-        for item in all_files:
-            # Pick the first non-folder file that has a parent
-            if item['mimeType'] != 'application/vnd.google-apps.folder' and item.get('parents'):
-                file_to_move = item
-                break
+        try:
+            # Ordered, so the demo deterministically picks the alphabetically first file
+            for item in self._iter_files(order_by="folder,name"):
+                # Pick the first non-folder file that has a parent
+                parents = item.get('parents')
+                if parents and item['mimeType'] != FOLDER_MIME:
+                    file_to_move = item
+                    break
+        except Exception as e:
+            print(f"Error fetching files: {e}")
+            return
 
         if not file_to_move:
             print("\n⚠️ No suitable file found to demonstrate sorting. Please upload a file first.")
             return
             
-        FILE_ID_TO_MOVE = file_to_move['id']
         CURRENT_PARENT_ID = file_to_move['parents'][0]
         
         print(f"Selected file: '{file_to_move['name']}'")
@@ -243,31 +354,36 @@ class DriveManager:
         target_folder_id = self.find_or_create_folder(TARGET_FOLDER_NAME)
         
         if target_folder_id and CURRENT_PARENT_ID != target_folder_id:
-             self._move_file(FILE_ID_TO_MOVE, CURRENT_PARENT_ID, target_folder_id)
+            if not self._move_file(file_to_move, target_folder_id):
+                # The cached folder may have been trashed or deleted; look it up again next time
+                self._folder_ids.pop(TARGET_FOLDER_NAME, None)
         elif target_folder_id:
             print(f"ℹ️ File is already in the target folder ({TARGET_FOLDER_NAME}). Skipping move.")
             
-    def _move_file(self, file_id, current_parent_id, new_parent_id):
-        """Internal function to execute the move operation."""
+    def _move_file(self, file, new_parent_id):
+        """
+        Internal function to execute the move operation. 'file' is an item from the
+        file listing, whose 'parents' and 'name' are used as-is (no extra get() call).
+        Returns True if the move succeeded.
+        """
         try:
-            # Get current parents
-            file = self.service.files().get(fileId=file_id, fields='parents, name').execute()
             previous_parents = ",".join(file.get('parents'))
-            file_name = file.get('name')
 
-            print(f"🔄 Moving '{file_name}' to folder ID: {new_parent_id}...")
+            print(f"🔄 Moving '{file['name']}' to folder ID: {new_parent_id}...")
             
             moved_file = self.service.files().update(
-                fileId=file_id,
+                fileId=file['id'],
                 addParents=new_parent_id,
                 removeParents=previous_parents,
                 fields='id, parents, name'
             ).execute()
 
             print(f"✅ Move successful! New Parent: {new_parent_id}")
+            return True
 
         except Exception as e:
             print(f"❌ An error occurred while moving the file: {e}")
+            return False
 
 def main_menu():
     """Interactive CLI menu loop."""